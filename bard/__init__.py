@@ -1,27 +1,57 @@
 
-from typing import Dict, List
-import requests 
+from typing import Dict, Iterable, List
+from concurrent.futures import ThreadPoolExecutor, as_completed 
 import urllib.parse 
-from rich.console import Console 
+import re 
 
 from bard.parsing import soupify 
 from bard.play import Play 
+from bard.session import get_session, POOL_SIZE 
 
-console = Console() 
+_console = None 
+
+def __getattr__(name): 
+    # rich and requests_cache are slow to import, so only pay for them when bard.console
+    # or bard.SESSION is used 
+    global _console 
+    if name == 'console': 
+        if _console is None: 
+            from rich.console import Console 
+            _console = Console() 
+        return _console 
+    if name == 'SESSION': 
+        return get_session() 
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# The index also links to the poems, which aren't plays 
+poetry_regex = re.compile('poetry', re.IGNORECASE)
 
 def fetch_plays() -> List['Play']:
     url = 'http://shakespeare.mit.edu'
 
-    response = requests.get(url) 
+    response = get_session().get(url) 
     soup = soupify(response.text) 
     tables = soup.findAll('table')
     
     central_table = tables[1] 
     anchors = central_table.findAll('a')
 
-    return [
-        Play(
-            a.text.strip(),
-            urllib.parse.urljoin(url, a.attrs.get('href'))
-        ) for a in anchors if a.attrs.get('href').lower().find('poetry') == -1
-    ]
\ No newline at end of file
+    plays = []
+    for a in anchors: 
+        href = a.attrs.get('href') 
+        if href and not poetry_regex.search(href): 
+            plays.append(Play(a.text.strip(), urllib.parse.urljoin(url, href)))
+    return plays
+
+def parse_all(plays: Iterable['Play'], max_workers: int = POOL_SIZE) -> List['Play']:
+    """Download the full text of each play on a pool of threads, and parse 
+    them one at a time (on this thread) as the downloads complete.
+
+    At most POOL_SIZE threads are used, since that is how many connections 
+    the shared session keeps open for reuse."""
+    plays = list(plays) 
+    with ThreadPoolExecutor(max_workers=min(max_workers, POOL_SIZE)) as executor: 
+        futures = { executor.submit(p._download): p for p in plays } 
+        for future in as_completed(futures): 
+            futures[future].parse_play(future.result()) 
+    return plays 
@@ -0,0 +1,89 @@
+"""Word counting over parsed plays, using flat numpy arrays and numba
+
+The text of every spoken line is packed into a single byte buffer, with
+an offsets array marking where each line starts and ends, so that the
+counting loop can be compiled by numba instead of walking Python objects.
+
+numpy and numba are optional dependencies: `pip install pybard[analytics]`
+"""
+
+from typing import Tuple
+
+import numba
+import numpy as np
+from numba import types
+from numba.typed import Dict
+
+FNV_OFFSET = np.uint64(14695981039346656037)
+FNV_PRIME = np.uint64(1099511628211)
+
+def play_arrays(play) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """The spoken lines of a parsed play as (buffer, offsets, speaker_ids)
+
+    buffer is the UTF-8 text of every line, concatenated; line i is
+    buffer[offsets[i]:offsets[i + 1]]. speaker_ids[i] is the index into
+    play.cast() of the character who speaks line i. Stage directions are skipped.
+    """
+    speaker_ids = { name: i for (i, name) in enumerate(play.cast()) }
+    chunks = []
+    offsets = [0]
+    ids = []
+    total = 0
+    for act in play.acts:
+        for scene in act.scenes:
+            for speech in scene.speeches():
+                speaker_id = speaker_ids[speech.speaker]
+                for line in speech.lines:
+                    if type(line) is str:
+                        encoded = line.encode('utf-8')
+                        chunks.append(encoded)
+                        total += len(encoded)
+                        offsets.append(total)
+                        ids.append(speaker_id)
+    return (
+        np.frombuffer(b"".join(chunks), dtype=np.uint8),
+        np.array(offsets, dtype=np.int64),
+        np.array(ids, dtype=np.int32)
+    )
+
+@numba.njit(cache=True)
+def _is_word_byte(c):
+    # ASCII letters, apostrophes ("o'er"), and any byte of a multi-byte UTF-8 character
+    return (65 <= c <= 90) or (97 <= c <= 122) or c == 39 or c >= 128
+
+@numba.njit(cache=True)
+def _fnv1a(buffer, start, end):
+    h = FNV_OFFSET
+    for i in range(start, end):
+        c = buffer[i]
+        if 65 <= c <= 90:
+            c += 32
+        h = (h ^ np.uint64(c)) * FNV_PRIME
+    # signed, so the hash round-trips through a Python int
+    return np.int64(h)
+
+@numba.njit(cache=True)
+def count_words(buffer, offsets):
+    """Count the words in each line of a buffer built by play_arrays
+
+    Words are case-folded and keyed by their 64-bit FNV-1a hash, see hash_token.
+    """
+    counts = Dict.empty(key_type=types.int64, value_type=types.int64)
+    for line in range(len(offsets) - 1):
+        i = offsets[line]
+        end = offsets[line + 1]
+        while i < end:
+            while i < end and not _is_word_byte(buffer[i]):
+                i += 1
+            start = i
+            while i < end and _is_word_byte(buffer[i]):
+                i += 1
+            if i > start:
+                h = _fnv1a(buffer, start, i)
+                counts[h] = counts.get(h, 0) + 1
+    return counts
+
+def hash_token(word: str) -> int:
+    """The key under which count_words counts `word`"""
+    encoded = np.frombuffer(word.encode('utf-8'), dtype=np.uint8)
+    return _fnv1a(encoded, 0, len(encoded))
@@ -1,4 +1,8 @@
 from bs4 import BeautifulSoup as Soup 
 
 def soupify(text: str) -> Soup: 
-    return Soup(text, 'html.parser')
\ No newline at end of file
+    return Soup(text, 'html.parser')
+
+def element_text(elem) -> str: 
+    """All of the text inside an lxml element, like BeautifulSoup's Tag.text"""
+    return "".join(elem.itertext())
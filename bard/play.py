@@ -1,26 +1,30 @@
 
 import urllib.parse
-from typing import List, Union
-from rich.tree import Tree 
-from rich.console import Console 
-import itertools 
-from functools import reduce 
+from typing import ClassVar, Iterable, List, Optional, Tuple, Union
+from collections import Counter 
 
-import requests
 import textwrap
 import re
+import sys 
+import io 
+import orjson 
+from lxml import etree 
 
-from bard.parsing import soupify 
-
-def add_dicts(d1, d2): 
-    keys = set(d1.keys()).union(set(d2.keys()))
-    return { k: d1.get(k, 0) + d2.get(k, 0) for k in keys }
+from bard.parsing import soupify, element_text 
+from bard.session import get_session 
 
 class DramaticEvent:
-    pass
+    __slots__ = ()
+
+    # 'direction' or 'speech', cheaper to test in the parsing loops than isinstance 
+    _kind: ClassVar[str]
 
 class Direction(DramaticEvent): 
 
+    __slots__ = ('direction',)
+
+    _kind = 'direction'
+
     direction: str 
 
     def __init__(self, direction: str): 
@@ -45,7 +49,7 @@ class Direction(DramaticEvent):
         }
 
 def serialize(value): 
-    if isinstance(value, str): 
+    if type(value) is str: 
         return {
             "type": "string", 
             "value": value
@@ -55,28 +59,57 @@ def serialize(value):
 
 class Speech(DramaticEvent): 
 
+    __slots__ = ('speaker', '_lines', '_pending_lines', 'act_no', 'scene_no', 'line_no')
+
+    _kind = 'speech'
+
     speaker: str 
-    lines: List[Union[str, Direction]]
+    _lines: Tuple[Union[str, Direction], ...]
+    _pending_lines: Optional[List[Union[str, Direction]]]
     act_no: int
     scene_no: int 
     line_no: int
 
-    def __init__(self, speaker: str, lines: List[Union[str, Direction]], act_no: int = 1, scene_no: int = 1, line_no: int = 1):
+    def __init__(self, speaker: str, lines: Iterable[Union[str, Direction]], act_no: int = 1, scene_no: int = 1, line_no: int = 1):
         self.speaker = speaker 
-        self.lines = lines 
+        self._lines = tuple(lines) 
+        self._pending_lines = None 
         self.act_no = act_no
         self.scene_no = scene_no 
         self.line_no = line_no
+
+    @property 
+    def lines(self) -> Tuple[Union[str, Direction], ...]: 
+        if self._pending_lines is not None: 
+            return tuple(self._pending_lines) 
+        return self._lines 
+
+    def add_line(self, line: Union[str, Direction]): 
+        """Append a line to a speech that its Scene is still adding to"""
+        if self._pending_lines is None: 
+            raise ValueError(f"Cannot add '{line}' to a complete speech: {self}")
+        self._pending_lines.append(line) 
+
+    def _open(self): 
+        # A Scene collects the lines of its latest speech in a list, and freezes
+        # them back into the tuple once it moves on (see Scene.close)
+        self._pending_lines = list(self._lines) 
+
+    def _freeze(self): 
+        if self._pending_lines is not None: 
+            self._lines = tuple(self._pending_lines) 
+            self._pending_lines = None 
     
     def scene_repr(self): 
-        formatted_lines = [x if isinstance(x, str) else f"\n{x}\n" for x in self.lines]
+        formatted_lines = [x if type(x) is str else f"\n{x}\n" for x in self.lines]
         body = textwrap.indent("\n".join(formatted_lines), prefix="   ")
         return f"{self.speaker.upper()}:\n\n{body}"
     
     @property 
     def directions(self): 
+        # lines are either strings or Directions
         for line in self.lines: 
-            if isinstance(line, Direction): 
+            if type(line) is not str: 
                 yield line
 
     def serialize(self): 
@@ -105,6 +138,8 @@ class Speech(DramaticEvent):
         )
 
     def __hash__(self): 
+        if self._pending_lines is not None: 
+            raise TypeError(f"Cannot hash a speech that is still being added to: {self}")
         return hash((self.speaker, self.lines, self.act_no, self.scene_no, self.line_no))
 
     def __lt__(self, other: 'Speech'): 
@@ -115,15 +150,27 @@ class Speech(DramaticEvent):
 
 scene_title_regex = re.compile("SCENE ([IVX]+)\\.(.*)")
 
+# Anchors named "<act>.<scene>.<line>" mark the lines of a speech 
+speech_id_regex = re.compile("(\\d+)\\.(\\d+)\\.(\\d+)")
+match_speech_id = speech_id_regex.match
+
 class Scene: 
 
+    __slots__ = ('events', 'title', 'act_no', 'scene_no', '_version')
+
+    _kind = 'scene'
+
     events: List[DramaticEvent] 
     title: str 
     act_no: int 
     scene_no: int 
+    # bumped whenever a new speech is started (including an "Unknown" one from add_line), 
+    # so Play can tell when its cached speaker counts are stale
+    _version: int 
 
     def __init__(self, title: str, act_no: int, scene_no: int): 
         self.events = [] 
+        self._version = 0 
         m = scene_title_regex.match(title) 
         if m is not None: 
             (roman_numerals, value) = m.groups() 
@@ -136,7 +183,7 @@ class Scene:
     @property 
     def directions(self): 
         for event in self.events: 
-            if isinstance(event, Direction): 
+            if event._kind == 'direction': 
                 yield event 
             else: 
                 for direc in event.directions: 
@@ -159,36 +206,47 @@ class Scene:
     def add_line(self, line, line_no: int = 1): 
         if len(self.events) == 0: raise ValueError("empty events list")
         last_event = self.events[-1] 
-        if not isinstance(last_event, Speech): 
+        if last_event._kind != 'speech': 
             #raise ValueError(f"Cannot add line '{line}' to non-Speech object")
-            self.events.append(Speech("Unknown", [line], self.act_no, self.scene_no, line_no))
+            self._version += 1 
+            new_speech = Speech("Unknown", [line], self.act_no, self.scene_no, line_no) 
+            new_speech._open() 
+            self.events.append(new_speech) 
         else: 
-            last_event.lines.append(line) 
+            last_event.add_line(line) 
     
     def add_direction(self, direction: str): 
         if len(self.events) == 0: 
             self.events.append(Direction(direction))
-        elif isinstance(self.events[-1], Direction): 
+        elif self.events[-1]._kind == 'direction': 
             self.events.append(Direction(direction))
         else:
-            self.events[-1].lines.append(Direction(direction))
+            self.events[-1].add_line(Direction(direction))
     
     def add_speech(self, speaker: str, line_no: int, first_line: str): 
+        self._version += 1 
+        self.close() 
         new_speech = Speech(speaker, [first_line], act_no=self.act_no, scene_no=self.scene_no, line_no=line_no)
+        new_speech._open() 
         self.events.append(new_speech) 
+
+    def close(self): 
+        """Complete the speech in progress, if any, so that its lines can no longer 
+        change and it can be hashed. This happens whenever the scene moves on to a 
+        new speech, or the parse moves on to a new scene."""
+        if len(self.events) > 0 and self.events[-1]._kind == 'speech': 
+            self.events[-1]._freeze() 
     
     def speeches(self): 
         for event in self.events: 
-            if isinstance(event, Speech): 
+            if event._kind == 'speech': 
                 yield event 
     
-    def speaker_counts(self): 
-        speakers = [event.speaker for event in self.speeches()]
-        speakers.sort() 
-        counted = { k: len(list(g)) for (k, g) in itertools.groupby(speakers) }
-        return counted
+    def speaker_counts(self) -> Counter: 
+        return Counter(event.speaker for event in self.speeches())
     
     def to_tree(self): 
+        from rich.tree import Tree 
         t = Tree(str(self)) 
         try: 
             first_dir = next(self.directions)
@@ -204,6 +262,10 @@ class Act:
     """An Act is a collection of Scenes, numbered (starting with 1)
     """
 
+    __slots__ = ('act_no', 'scenes')
+
+    _kind = 'act'
+
     act_no: int 
     scenes: List[Scene]
 
@@ -225,9 +287,16 @@ class Act:
     def add_scene(self, title: str): 
         """Add a new scene to the end of the list of scenes in the play"""
         scene_no = self.scenes[-1].scene_no + 1 if len(self.scenes) > 0 else 1 
+        self.close() 
         scene = Scene(title, self.act_no, scene_no) 
         self.scenes.append(scene) 
+        return scene 
     
+    def close(self): 
+        """Complete the speech in progress in the last scene, see Scene.close"""
+        if len(self.scenes) > 0: 
+            self.scenes[-1].close() 
+
     def add_line(self, line, line_no: int = 0): 
         self.scenes[-1].add_line(line, line_no=line_no) 
     
@@ -237,10 +306,14 @@ class Act:
     def add_speech(self, speaker: str, line_no: int, first_line: str): 
         self.scenes[-1].add_speech(speaker, line_no, first_line) 
     
-    def speaker_counts(self): 
-        return reduce(add_dicts, [s.speaker_counts() for s in self.scenes])
+    def speaker_counts(self) -> Counter: 
+        total = Counter() 
+        for scene in self.scenes: 
+            total += scene.speaker_counts() 
+        return total
 
     def to_tree(self): 
+        from rich.tree import Tree 
         t = Tree(str(self)) 
         for scene in self.scenes: 
             t.add(scene.to_tree())
@@ -249,18 +322,31 @@ class Act:
 
 class Play: 
 
+    __slots__ = ('url', 'title', '_full_url', '_full_url_resolved', '_speaker_counts', '_cast', '_counts_key', 'acts')
+
+    _kind = 'play'
+
     url: str 
     title: str 
     _full_url: str 
+    _full_url_resolved: bool
+    _speaker_counts: Optional[Counter]
+    _cast: Optional[List[str]]
+    _counts_key: Optional[tuple]
     acts: List[Act]
 
     def __init__(self, title: str, url: str, full_play_url: str = None): 
         self.title = title 
         self.url = url 
         self._full_url = None
+        self._full_url_resolved = False 
+        self._speaker_counts = None 
+        self._cast = None 
+        self._counts_key = None 
         self.acts = [] 
 
     def to_tree(self): 
+        from rich.tree import Tree 
         t = Tree(str(self)) 
         for act in self.acts: 
             t.add(act.to_tree())
@@ -275,51 +361,147 @@ class Play:
         }
     
     def fetch_full_play_text(self): 
-        response = requests.get(self.full_play_url) 
+        response = get_session().get(self.full_play_url) 
         soup = soupify(response.text) 
         return soup.text 
 
-    def speaker_counts(self): 
-        return reduce(add_dicts, [s.speaker_counts() for s in self.acts])
+    def _cached_counts(self) -> Counter: 
+        # Valid as long as no scene has been added, removed, or given a new speech, 
+        # however that happened; checking is one step per scene rather than per speech
+        key = tuple((scene, scene._version) for act in self.acts for scene in act.scenes) 
+        if key != self._counts_key: 
+            total = Counter() 
+            for act in self.acts: 
+                total += act.speaker_counts() 
+            self._speaker_counts = total 
+            self._cast = None 
+            self._counts_key = key 
+        return self._speaker_counts 
+
+    def speaker_counts(self) -> Counter: 
+        # callers get their own copy, so they can't change the cached one
+        return Counter(self._cached_counts())
     
     def cast(self): 
-        sc = self.speaker_counts() 
-        counted = sorted([(sc[k], k) for k in sc], reverse=True) 
-        return [x[1] for x in counted]
+        counts = self._cached_counts() 
+        if self._cast is None: 
+            self._cast = [name for (name, _) in counts.most_common()]
+        return list(self._cast)
+
+    def to_arrays(self): 
+        """The spoken text of the play as flat numpy arrays, see bard.analytics.play_arrays"""
+        from bard.analytics import play_arrays 
+        return play_arrays(self) 
     
-    def parse_play(self): 
-        response = requests.get(self.full_play_url) 
-        events = event_stream(response.text) 
-        speech_pattern = re.compile("(\\d+)\\.(\\d+)\\.(\\d+)")
-        new_speaker: str = None
-        
-        for (line, offset, tag) in events: 
-            content = tag.text.strip()
-            if tag.name == 'h3': 
-                if content.startswith('ACT'): 
-                    self.add_act() 
-                elif content.startswith('SCENE'): 
-                    self.add_scene(content) 
-                else: 
-                    pass
-            elif tag.name == 'i': 
-                self.add_direction(content)
-            elif tag.name == 'a': 
-                tag_name = tag.attrs.get('name')
-                if tag_name is not None: 
-                    m = speech_pattern.match(tag_name) 
-                    if m is not None: 
-                        [_, _, line_no] = [int(v) for v in m.groups()]
-                        if new_speaker is not None: 
-                            self.add_speech(new_speaker, line_no, content)
-                            new_speaker = None
-                        else: 
-                            self.add_line(content, line_no)
-                    else: 
-                        new_speaker = content
+    def parse_play(self, text: Optional[str] = None): 
+        """Parse the full text of the play into Acts, Scenes and Speeches.
+
+        If the HTML of the full play has already been fetched, it can be passed in 
+        as `text` to avoid a second request."""
+        if text is None: 
+            text = self._download() 
+        self._parse(text) 
+
+    def _download(self) -> str: 
+        return get_session().get(self.full_play_url).text 
+
+    def _parse(self, text: str): 
+        builders = { 
+            'act': self.add_act, 
+            'direction': self.add_direction, 
+            'speech': self.add_speech, 
+            'line': self.add_line 
+        }
+        for (_, _, event) in self._iter_numbered_events(text): 
+            kind = event[0] 
+            if kind == 'scene': 
+                # until the next scene, everything is added straight to this one, rather 
+                # than finding it through acts[-1].scenes[-1] each time; the stream has 
+                # already checked that nothing falls between an act and its first scene
+                scene = self.add_scene(event[1]) 
+                builders['direction'] = scene.add_direction 
+                builders['speech'] = scene.add_speech 
+                builders['line'] = scene.add_line 
+            else: 
+                builders[kind](*event[1:]) 
+        if len(self.acts) > 0: 
+            self.acts[-1].close() 
+
+    def _iter_events(self, text: str): 
+        """The parse events of the play, as (kind, *args) tuples
+
+        Each kind names the add_* method its args are meant for: ('act',), 
+        ('scene', title), ('direction', direction), ('speech', speaker, line_no, first_line) 
+        and ('line', line, line_no)"""
+        state = _ParseState() 
+        for tag in event_stream(text): 
+            event = _tag_handlers[tag.tag](tag, state) 
+            if event is not None: 
+                yield event 
+
+    def _iter_numbered_events(self, text: str): 
+        """Pairs each event from _iter_events with the act and scene it falls in
+
+        Events that the Play couldn't be built from raise the same errors that 
+        the add_* methods would: IndexError for a scene before the first act, or 
+        anything else outside of a scene, and ValueError for a line that opens 
+        a scene. parse_play, iter_speakers and iter_directions all read from 
+        here, so they accept and reject the same documents."""
+        act_no = scene_no = 0 
+        scene_is_empty = False 
+        for event in self._iter_events(text): 
+            kind = event[0] 
+            if kind == 'act': 
+                act_no += 1 
+                scene_no = 0 
+            elif kind == 'scene': 
+                if act_no == 0: 
+                    raise IndexError(f"Scene '{event[1]}' comes before the first act")
+                scene_no += 1 
+                scene_is_empty = True 
+            else: 
+                if scene_no == 0: 
+                    raise IndexError(f"The {kind} {event[1]!r} is not inside a scene")
+                if kind == 'line' and scene_is_empty: 
+                    raise ValueError(f"The line {event[1]!r} comes before any speech or direction in its scene")
+                scene_is_empty = False 
+            yield (act_no, scene_no, event) 
+
+    def iter_speakers(self, text: Optional[str] = None): 
+        """Stream (act_no, scene_no, speaker) for each speech in the play, 
+        without building the Acts, Scenes and Speeches that parse_play does. 
+        Fails on the same documents as parse_play, see _iter_numbered_events"""
+        if text is None: 
+            text = self._download() 
+        in_speech = False 
+        for (act_no, scene_no, event) in self._iter_numbered_events(text): 
+            kind = event[0] 
+            if kind == 'speech': 
+                in_speech = True 
+                yield (act_no, scene_no, event[1]) 
+            elif kind == 'line': 
+                # as in Scene.add_line, a line after a direction, outside of any speech, 
+                # starts an "Unknown" one
+                if not in_speech: 
+                    in_speech = True 
+                    yield (act_no, scene_no, "Unknown") 
+            elif kind != 'direction': 
+                in_speech = False 
+
+    def iter_directions(self, text: Optional[str] = None): 
+        """Stream (act_no, scene_no, direction) for each stage direction in the play, 
+        without building the Acts, Scenes and Speeches that parse_play does. 
+        Fails on the same documents as parse_play, see _iter_numbered_events"""
+        if text is None: 
+            text = self._download() 
+        for (act_no, scene_no, event) in self._iter_numbered_events(text): 
+            if event[0] == 'direction': 
+                yield (act_no, scene_no, event[1]) 
 
     def add_act(self): 
         act_no = (self.acts[-1].act_no + 1) if len(self.acts) > 0 else 1 
+        if len(self.acts) > 0: 
+            self.acts[-1].close() 
         act = Act(act_no)
         self.acts.append(act) 
 
@@ -327,40 +509,136 @@ class Play:
         self.acts[-1].add_direction(direction) 
 
     def add_scene(self, title: str): 
-        self.acts[-1].add_scene(title) 
+        return self.acts[-1].add_scene(title) 
     
     def add_line(self, line, line_no: int = 0): 
         self.acts[-1].add_line(line, line_no=line_no) 
     
     def add_speech(self, speaker: str, line_no: int, first_line: str): 
         self.acts[-1].add_speech(speaker, line_no, first_line) 
+
     
     @property 
     def full_play_url(self): 
-        if self._full_url is None: 
-            response = requests.get(self.url) 
+        # Remember a missing "Entire play" link too, so we only ask once
+        if not self._full_url_resolved: 
+            response = get_session().get(self.url) 
             soup = soupify(response.text) 
             anchors = soup.findAll('a') 
             entire_play_links = [x for x in anchors if x.text.find('Entire') != -1] 
             if len(entire_play_links) > 0: 
                 relative_href = entire_play_links[0].attrs['href']
                 self._full_url = urllib.parse.urljoin(self.url, relative_href)
+            self._full_url_resolved = True 
         return self._full_url
     
     def fetch_raw(self): 
-        response = requests.get(self.full_play_url) 
+        response = get_session().get(self.full_play_url) 
         return soupify(response.text) 
     
     def __repr__(self): 
         return f'"{self.title}"'
 
-def make_event(tag): 
-    return (tag.sourceline, tag.sourcepos, tag) 
+class _ParseState: 
+    """What the tag handlers carry from one tag to the next, within a single parse"""
 
-def event_stream(text): 
-    soup = soupify(text) 
-    anchors = [make_event(e) for e in soup.findAll('a') ] 
-    italics = [make_event(e) for e in soup.findAll('i') ]
-    h3s = [make_event(e) for e in soup.findAll('h3')]
-    return sorted(anchors + italics + h3s)
-    
+    __slots__ = ('new_speaker',)
+
+    new_speaker: Optional[str]
+
+    def __init__(self): 
+        self.new_speaker = None 
+
+def _handle_h3(tag, state: _ParseState): 
+    content = element_text(tag).strip() 
+    if content.startswith(('ACT', 'SCENE')): 
+        if content[0] == 'A': 
+            return ('act',) 
+        else: 
+            return ('scene', content) 
+
+def _handle_i(tag, state: _ParseState): 
+    return ('direction', element_text(tag).strip()) 
+
+def _handle_a(tag, state: _ParseState): 
+    tag_name = tag.get('name') 
+    if tag_name is None: 
+        return 
+    content = element_text(tag).strip() 
+    # most anchors aren't line numbers, so skip the regex when it can't match
+    if tag_name[:1].isdigit() and tag_name.count('.') >= 2: 
+        m = match_speech_id(tag_name) 
+    else: 
+        m = None 
+    if m is not None: 
+        line_no = int(m.group(3)) 
+        if state.new_speaker is not None: 
+            speaker = state.new_speaker 
+            state.new_speaker = None 
+            return ('speech', speaker, line_no, content) 
+        else: 
+            return ('line', content, line_no) 
+    else: 
+        # a play has a few dozen speakers across thousands of speeches
+        state.new_speaker = sys.intern(content) 
+
+_tag_handlers = { 'h3': _handle_h3, 'i': _handle_i, 'a': _handle_a }
+
+def _json_string(value: str): 
+    return { "type": "string", "value": value }
+
+# Each encoder returns a shallow dict, leaving orjson to call back into 
+# _json_default for the children, so the whole serialize() tree is never built
+_json_encoders = {
+    'direction': lambda d: { "type": "direction", "direction": d.direction }, 
+    'speech': lambda s: {
+        "type": "speech", 
+        "speaker": s.speaker, 
+        "lines": [_json_string(v) if type(v) is str else v for v in s.lines], 
+        "act_no": s.act_no, 
+        "scene_no": s.scene_no, 
+        "line_no": s.line_no
+    }, 
+    'scene': lambda s: {
+        "type": "scene", 
+        "title": s.title, 
+        "act_no": s.act_no, 
+        "scene_no": s.scene_no, 
+        "events": s.events
+    }, 
+    'act': lambda a: { "type": "act", "scenes": a.scenes }, 
+    'play': lambda p: { "type": "play", "title": p.title, "url": p.url, "acts": p.acts }, 
+}
+
+def _json_default(obj): 
+    encoder = _json_encoders.get(getattr(obj, '_kind', None)) 
+    if encoder is None: 
+        raise TypeError(f"Cannot serialize {type(obj).__name__}") 
+    return encoder(obj) 
+
+def dumps(value) -> bytes: 
+    """JSON for a Play (or any part of one), in the same shape as its serialize()"""
+    return orjson.dumps(value, default=_json_default) 
+
+# The tags that drive the parse, see Play._parse 
+event_tags = ('a', 'i', 'h3')
+
+def event_stream(text: str): 
+    """The <a>, <i> and <h3> elements of the play, in document order
+
+    The document is parsed incrementally, and each element is cleared once the
+    caller moves past it, so the full tree is never held in memory. Callers
+    must read what they need from an element before advancing the stream."""
+    source = io.BytesIO(text.encode('utf-8')) 
+    for (_, elem) in etree.iterparse(source, events=('end',), tag=event_tags, html=True, encoding='utf-8'): 
+        # iterparse reports an element when it closes, so one nested inside another 
+        # event tag would come out before its parent; instead it's left in place and 
+        # yielded, in document order, right after the element that encloses it
+        if next(elem.iterancestors(*event_tags), None) is not None: 
+            continue 
+        yield elem 
+        for nested in elem.iterdescendants(*event_tags): 
+            yield nested 
+        elem.clear() 
+        while elem.getprevious() is not None: 
+            del elem.getparent()[0]
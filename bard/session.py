@@ -0,0 +1,36 @@
+import os
+import threading
+
+POOL_SIZE = 16
+
+_session = None
+_session_lock = threading.Lock()
+
+def cache_path() -> str:
+    """Where fetched pages are cached, under the user's cache directory"""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(cache_home, 'pybard', 'http_cache.sqlite')
+
+def get_session():
+    """The CachedSession shared by everything that fetches from shakespeare.mit.edu
+
+    It is created on first use, so that importing bard neither pays for
+    requests_cache nor creates the cache file."""
+    global _session
+    if _session is None:
+        # parse_all calls this from its worker threads
+        with _session_lock:
+            if _session is None:
+                import requests_cache
+                from requests.adapters import HTTPAdapter
+
+                path = cache_path()
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                session = requests_cache.CachedSession(path, backend='sqlite', expire_after=None)
+
+                # Keep enough pooled connections around for one per worker in bard.parse_all
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
@@ -15,9 +15,18 @@ setup(
     },
     install_requires=[
         "requests", 
+        "requests-cache", 
         "click", 
-        "rich"
+        "rich", 
+        "lxml", 
+        "orjson"
     ],
+    extras_require={
+        "analytics": [
+            "numpy", 
+            "numba"
+        ]
+    },
     tests_require=[
         "pytest", 
         "black", 
@@ -0,0 +1,26 @@
+import pytest
+
+pytest.importorskip("numba")
+
+from bard.analytics import count_words, hash_token
+from bard.play import Play
+
+def test_count_words(): 
+    play = Play("Macbeth", "http://shakespeare.mit.edu/macbeth/index.html")
+    play.add_act() 
+    play.add_scene("SCENE I. A desert place.")
+    play.add_speech("First Witch", 1, "When shall we three meet again")
+    play.add_line("In thunder, lightning, or in rain?", 2)
+    play.add_direction("Aside")
+    play.add_speech("Second Witch", 3, "When the hurlyburly's done,")
+
+    (buffer, offsets, speaker_ids) = play.to_arrays() 
+    assert bytes(buffer[offsets[2]:offsets[3]]).decode() == "When the hurlyburly's done,"
+    cast = play.cast() 
+    assert [cast[i] for i in speaker_ids] == ["First Witch", "First Witch", "Second Witch"]
+
+    counts = count_words(buffer, offsets) 
+    assert counts[hash_token("when")] == 2
+    assert counts[hash_token("Hurlyburly's")] == 1
+    assert hash_token("aside") not in counts
+    assert sum(counts.values()) == 16
@@ -0,0 +1,50 @@
+import threading
+
+import bard
+from bard import session
+
+INDEX_HTML = """
+<html><body>
+<a href="full.html">Entire play</a> in one page
+</body></html>
+"""
+
+FULL_HTML = """
+<html><body>
+<h3>ACT I</h3>
+<h3>SCENE I. A room in the palace.</h3>
+<a name="speech1"><b>%s</b></a>
+<blockquote>
+<a name="1.1.1">Now is the winter of our discontent</a><br>
+</blockquote>
+</body></html>
+"""
+
+class FakeResponse: 
+    def __init__(self, text): 
+        self.text = text 
+
+class FakeSession: 
+    """Serves every index page with an 'Entire play' link, and names the 
+    play's directory as the only speaker of its full text"""
+
+    def __init__(self): 
+        self.full_play_threads = set() 
+
+    def get(self, url): 
+        if url.endswith('index.html'): 
+            return FakeResponse(INDEX_HTML) 
+        self.full_play_threads.add(threading.current_thread().name)
+        return FakeResponse(FULL_HTML % url.split('/')[-2])
+
+def test_parse_all(monkeypatch): 
+    fake = FakeSession() 
+    monkeypatch.setattr(session, '_session', fake)
+    names = ['richardiii', 'henryv', 'hamlet', 'lear', 'macbeth']
+    plays = [bard.Play(name, f"http://shakespeare.mit.edu/{name}/index.html") for name in names]
+
+    parsed = bard.parse_all(plays, max_workers=3) 
+
+    assert parsed == plays
+    assert [p.cast() for p in parsed] == [[name] for name in names]
+    assert threading.current_thread().name not in fake.full_play_threads
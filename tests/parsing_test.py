@@ -0,0 +1,41 @@
+
+from bard.parsing import element_text 
+from bard.play import event_stream 
+
+def test_event_stream_document_order(): 
+    html = """
+    <html><body>
+    <h3>ACT I</h3>
+    <h3>SCENE I. A desert place.</h3>
+    <i>Thunder and lightning. Enter three Witches</i>
+    <a name="speech1"><b>First Witch</b></a>
+    <blockquote>
+    <a name="1.1.1">When shall we three meet again</a><br>
+    </blockquote>
+    </body></html>
+    """
+    tags = [(e.tag, element_text(e).strip()) for e in event_stream(html)]
+    assert tags == [
+        ("h3", "ACT I"), 
+        ("h3", "SCENE I. A desert place."), 
+        ("i", "Thunder and lightning. Enter three Witches"), 
+        ("a", "First Witch"), 
+        ("a", "When shall we three meet again"), 
+    ]
+
+
+def test_event_stream_nested_tags(): 
+    html = """
+    <html><body>
+    <blockquote>
+    <a name="1.1.2">In thunder, <i>lightning</i>, or in rain?</a><br>
+    <a name="1.1.3">When the hurlyburly's done,</a><br>
+    </blockquote>
+    </body></html>
+    """
+    tags = [(e.tag, element_text(e).strip()) for e in event_stream(html)]
+    assert tags == [
+        ("a", "In thunder, lightning, or in rain?"), 
+        ("i", "lightning"), 
+        ("a", "When the hurlyburly's done,"), 
+    ]
@@ -1,5 +1,33 @@
 
-from bard.play import Play, Act, Scene, Speech 
+import json 
+import pytest 
+
+from bard.play import Play, Act, Scene, Speech, dumps 
+
+MACBETH_HTML = """
+<html><body>
+<a href="/Shakespeare">Shakespeare homepage</a>
+<h3>ACT I</h3>
+<h3>SCENE I. A desert place.</h3>
+<p><blockquote><i>Thunder and lightning. Enter three Witches</i></blockquote></p>
+<a name="speech1"><b>First Witch</b></a>
+<blockquote>
+<a name="1.1.1">When shall we three meet again</a><br>
+<a name="1.1.2">In thunder, lightning, or in rain?</a><br>
+</blockquote>
+<a name="speech2"><b>Second Witch</b></a>
+<blockquote>
+<a name="1.1.3">When the hurlyburly's done,</a><br>
+<p><i>Exeunt</i></p>
+</blockquote>
+<h3>ACT II</h3>
+<h3>SCENE I. Court of Macbeth's castle.</h3>
+<a name="speech1"><b>BANQUO</b></a>
+<blockquote>
+<a name="2.1.1">How goes the night, boy?</a><br>
+</blockquote>
+</body></html>
+"""
 
 def test_speech_equality(): 
     speech1 = Speech("John", ["Hi, my name is", "John"])
@@ -11,4 +39,215 @@ def test_speech_equality():
     assert speech1 == speech2 
     assert speech1 != speech3
     assert speech1 != speech4
-    assert speech1 != speech5
\ No newline at end of file
+    assert speech1 != speech5
+
+
+def test_speaker_counts(): 
+    play = Play("Macbeth", "http://shakespeare.mit.edu/macbeth/index.html")
+    assert play.speaker_counts() == {}
+
+    play.add_act() 
+    play.add_scene("SCENE I. A desert place.")
+    play.add_direction("Thunder and lightning. Enter three Witches")
+    play.add_speech("First Witch", 1, "When shall we three meet again")
+    play.add_speech("Second Witch", 3, "When the hurlyburly's done,")
+    play.add_speech("First Witch", 7, "I come, Graymalkin!")
+    play.add_act() 
+    play.add_scene("SCENE I. Another place.")
+    play.add_speech("Second Witch", 1, "Where hast thou been, sister?")
+
+    assert play.acts[0].speaker_counts() == {"First Witch": 2, "Second Witch": 1}
+    assert play.speaker_counts() == {"First Witch": 2, "Second Witch": 2}
+
+
+def test_scene_speaker_counts(): 
+    scene = Scene("SCENE II. A camp near Forres.", 1, 2)
+    scene.add_direction("Alarum within. Enter DUNCAN, MALCOLM, DONALBAIN, LENNOX")
+    scene.add_line("What bloody man is that?", 1)
+    scene.add_speech("MALCOLM", 3, "This is the sergeant")
+    scene.add_speech("DUNCAN", 8, "Say to the king the knowledge of the broil")
+
+    counts = scene.speaker_counts() 
+    assert counts == {"Unknown": 1, "MALCOLM": 1, "DUNCAN": 1}
+    assert counts["LENNOX"] == 0
+
+
+def test_cast_follows_new_speeches(): 
+    play = Play("Macbeth", "http://shakespeare.mit.edu/macbeth/index.html")
+    play.add_act() 
+    play.add_scene("SCENE III. A heath near Forres.")
+    play.add_speech("First Witch", 1, "Where hast thou been, sister?")
+    assert play.cast() == ["First Witch"]
+
+    play.add_speech("Second Witch", 2, "Killing swine.")
+    play.add_speech("Second Witch", 3, "Sister, where thou?")
+    assert play.cast() == ["Second Witch", "First Witch"]
+
+
+def test_speech_hash(): 
+    scene = Scene("SCENE I. A desert place.", 1, 1)
+    scene.add_speech("First Witch", 1, "When shall we three meet again")
+    scene.add_line("In thunder, lightning, or in rain?", 2)
+    scene.add_speech("Second Witch", 3, "When the hurlyburly's done,")
+
+    (first, second) = scene.speeches()
+    assert first.lines == ("When shall we three meet again", "In thunder, lightning, or in rain?")
+
+    copy = Speech("First Witch", list(first.lines), 1, 1, 1)
+    assert hash(copy) == hash(first)
+
+    # the scene is still adding to its last speech
+    with pytest.raises(TypeError): 
+        hash(second)
+    scene.add_line("When the battle's lost and won.", 4)
+    scene.close() 
+
+    speeches = {first, second, copy}
+    assert len(speeches) == 2
+    with pytest.raises(ValueError): 
+        scene.add_line("That will be ere the set of sun.", 5)
+    assert second in speeches
+    assert second.lines == ("When the hurlyburly's done,", "When the battle's lost and won.")
+
+
+def test_parse_play(): 
+    play = Play("Macbeth", "http://shakespeare.mit.edu/macbeth/index.html")
+    play.parse_play(MACBETH_HTML) 
+
+    assert [a.act_no for a in play.acts] == [1, 2]
+    scene = play.acts[0].scenes[0]
+    assert scene.title == " A desert place."
+    (first, second) = scene.speeches() 
+    assert first.speaker == "First Witch"
+    assert first.line_no == 1
+    assert first.lines == ("When shall we three meet again", "In thunder, lightning, or in rain?")
+    assert [d.direction for d in second.directions] == ["Exeunt"]
+    assert play.speaker_counts() == {"First Witch": 1, "Second Witch": 1, "BANQUO": 1}
+    # parsing is over, so every speech is complete
+    assert len({s for act in play.acts for scene in act.scenes for s in scene.speeches()}) == 3
+
+
+def test_iter_speakers(): 
+    play = Play("Macbeth", "http://shakespeare.mit.edu/macbeth/index.html")
+    assert list(play.iter_speakers(MACBETH_HTML)) == [
+        (1, 1, "First Witch"), 
+        (1, 1, "Second Witch"), 
+        (2, 1, "BANQUO"), 
+    ]
+    assert list(play.iter_directions(MACBETH_HTML)) == [
+        (1, 1, "Thunder and lightning. Enter three Witches"), 
+        (1, 1, "Exeunt"), 
+    ]
+    assert play.acts == []
+
+
+def test_dumps(): 
+    play = Play("Macbeth", "http://shakespeare.mit.edu/macbeth/index.html")
+    play.parse_play(MACBETH_HTML) 
+    assert json.loads(dumps(play)) == play.serialize()
+
+
+def test_interleaved_event_streams(): 
+    html = """
+    <h3>ACT I</h3>
+    <h3>SCENE I. Elsinore. A platform before the castle.</h3>
+    <i>FRANCISCO at his post. Enter to him BERNARDO</i>
+    <a name="speech1"><b>BERNARDO</b></a>
+    <blockquote>
+    <a name="1.1.1">Who's there?</a><br>
+    <a name="1.1.2">Long live the king!</a><br>
+    </blockquote>
+    <a name="speech2"><b>FRANCISCO</b></a>
+    <blockquote>
+    <i>Aside</i>
+    <a name="1.1.3">Nay, answer me: stand, and unfold yourself.</a><br>
+    </blockquote>
+    """
+    play = Play("Hamlet", "http://shakespeare.mit.edu/hamlet/index.html")
+    speakers = play.iter_speakers(html) 
+    assert next(speakers) == (1, 1, "BERNARDO")
+
+    # stops just after FRANCISCO is read, but before his speech starts
+    directions = play.iter_directions(html) 
+    next(directions) 
+    assert next(directions) == (1, 1, "Aside")
+
+    assert list(speakers) == [(1, 1, "FRANCISCO")]
+    assert list(directions) == []
+
+    play.parse_play(html) 
+    assert play.speaker_counts() == {"BERNARDO": 1, "FRANCISCO": 1}
+
+
+def test_cast_follows_act_api_changes(): 
+    play = Play("Macbeth", "http://shakespeare.mit.edu/macbeth/index.html")
+    play.add_act() 
+    play.add_scene("SCENE I. A desert place.")
+    play.add_speech("A", 1, "x")
+    assert play.cast() == ["A"]
+
+    play.acts[0].add_speech("B", 2, "y")
+    play.acts[0].add_speech("B", 3, "z")
+    assert play.cast() == ["B", "A"]
+    assert play.speaker_counts() == {"A": 1, "B": 2}
+
+    play.acts[0].add_scene("SCENE II. A camp near Forres.")
+    play.acts[0].scenes[-1].add_speech("A", 1, "w")
+    play.acts[0].scenes[-1].add_speech("A", 2, "v")
+    assert play.cast() == ["A", "B"]
+
+
+def test_build_through_act_api(): 
+    play = Play("Macbeth", "http://shakespeare.mit.edu/macbeth/index.html")
+    with pytest.raises(IndexError): 
+        play.add_speech("A", 1, "x")
+
+    play.add_act() 
+    play.acts[0].add_scene("SCENE I. A desert place.")
+    play.add_speech("A", 1, "x")
+    play.acts[0].add_scene("SCENE II. A camp near Forres.")
+    play.add_speech("B", 1, "y")
+    assert [s.speaker_counts() for s in play.acts[0].scenes] == [{"A": 1}, {"B": 1}]
+
+
+def test_scene_version(): 
+    scene = Scene("SCENE I. A desert place.", 1, 1)
+    scene.add_direction("Thunder and lightning. Enter three Witches")
+    scene.add_line("When shall we three meet again", 1)
+    assert scene._version == 1
+
+    scene.add_line("In thunder, lightning, or in rain?", 2)
+    scene.add_direction("Aside")
+    assert scene._version == 1
+
+    scene.add_speech("Second Witch", 3, "When the hurlyburly's done,")
+    assert scene._version == 2
+
+
+@pytest.mark.parametrize("html, error", [
+    ("<h3>ACT I</h3><i>Flourish</i><h3>SCENE I. A room of state.</h3>", IndexError), 
+    ("<i>Flourish</i><h3>ACT I</h3>", IndexError), 
+    ("<h3>SCENE I. A room of state.</h3>", IndexError), 
+    ("<h3>ACT I</h3><h3>SCENE I. Elsinore.</h3><a name='1.1.1'>Who's there?</a>", ValueError), 
+])
+def test_rejected_by_every_consumer(html, error): 
+    play = Play("Hamlet", "http://shakespeare.mit.edu/hamlet/index.html")
+    with pytest.raises(error): 
+        list(play.iter_speakers(html))
+    with pytest.raises(error): 
+        list(play.iter_directions(html))
+    with pytest.raises(error): 
+        play.parse_play(html) 
+
+
+def test_unknown_speaker_in_every_consumer(): 
+    html = """
+    <h3>ACT I</h3>
+    <h3>SCENE I. Elsinore.</h3>
+    <i>Enter BERNARDO and FRANCISCO</i>
+    <a name="1.1.1">Who's there?</a><br>
+    """
+    play = Play("Hamlet", "http://shakespeare.mit.edu/hamlet/index.html")
+    assert list(play.iter_speakers(html)) == [(1, 1, "Unknown")]
+    play.parse_play(html) 
+    assert play.cast() == ["Unknown"]
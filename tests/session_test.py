@@ -0,0 +1,14 @@
+import os
+
+from bard import session
+
+def test_get_session(tmp_path, monkeypatch): 
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    monkeypatch.setattr(session, '_session', None)
+    monkeypatch.chdir(tmp_path)
+
+    s = session.get_session() 
+    assert s is session.get_session()
+    assert os.path.isabs(session.cache_path())
+    assert session.cache_path().startswith(str(tmp_path / 'cache'))
+    assert os.listdir(tmp_path) == ['cache']